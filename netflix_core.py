@@ -0,0 +1,274 @@
+# Catalog loading, filter parsing, scoring and explanations for the Movie AI Agent.
+# netflix_agent_app.py holds only the Streamlit UI and imports from here.
+import streamlit as st
+import openai
+import orjson
+from zoneinfo import ZoneInfo
+import heapq
+from collections import defaultdict
+
+# --- API Key ---
+# One client (and its pooled HTTP connections) per process, not per rerun
+@st.cache_resource
+def get_openai_client():
+    return openai.OpenAI(api_key=st.secrets["openai_api_key"])
+
+# --- Timezone ---
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+def hour_label(hour):
+    if 5 <= hour < 11:
+        return "perfect for a morning watch"
+    elif 11 <= hour < 14:
+        return "a great midday pick"
+    elif 14 <= hour < 17:
+        return "a great afternoon pick"
+    elif 17 <= hour < 21:
+        return "ideal for tonight’s unwind"
+    elif 21 <= hour < 23:
+        return "a solid late-night option"
+    else:
+        return "a very late watch — maybe save it for tomorrow"
+
+# Lookup tables for the "you'll finish by" line, indexed by now.hour / now.weekday()
+HOUR_LABELS = tuple(hour_label(h) for h in range(24))
+DAY_LABELS = (
+    "It’s Monday — how about something uplifting?",
+    "It’s Tuesday — a midweek escape could be just right.",
+    "It’s Wednesday — halfway there, treat yourself.",
+    "It’s Thursday — almost the weekend, time for something cozy.",
+    "It’s Friday night — perfect for family movie time.",
+    "It’s Saturday — time to relax and enjoy something fun.",
+    "It’s Sunday — the perfect wind-down before a new week."
+)
+
+# --- Subject keywords parse_filters can extract ---
+KEYWORDS = ("dinosaur", "pirate", "robot", "space", "war")
+
+# --- Age Ratings (least to most restrictive) ---
+RATING_ORDER = {"G": 0, "PG": 1, "PG-13": 2, "R": 3, "NC-17": 4}
+UNRATED = 99
+
+# --- Load Movies (parsed once per process) ---
+# Only the fields the app reads are kept from each record
+MOVIE_FIELDS = ("title", "rating", "age_rating", "runtime", "genres", "tags",
+                "description", "rt_quote", "director", "stars")
+
+# A missing file raises out of the cached call, so the failure isn't cached
+@st.cache_resource
+def load_movies(path="movies.json"):
+    with open(path, "rb") as f:
+        movies = [{k: m[k] for k in MOVIE_FIELDS if k in m} for m in orjson.loads(f.read())]
+
+    # Lowercase the searchable fields once so scoring is just set lookups
+    for i, m in enumerate(movies):
+        m["_id"] = i
+        m["_rating_ord"] = RATING_ORDER.get(m.get("age_rating"), UNRATED)
+        m["_genres_lc"] = frozenset(g.lower() for g in m.get("genres", []))
+        m["_tags_lc"] = frozenset(t.lower() for t in m.get("tags", []))
+        # Keywords are a fixed list, so which ones the description contains can be
+        # worked out once; substring matches keep "spacecraft" and "warriors"
+        desc = m.get("description", "").lower()
+        m["_desc_keywords"] = frozenset(k for k in KEYWORDS if k in desc)
+        # Display strings that only depend on the record
+        m["_stars_str"] = ", ".join(m.get("stars", []))
+    return movies
+
+@st.cache_resource
+def build_index():
+    # Inverted indexes: lowercased genre / tag / description keyword / age rating -> movie ids
+    index = {"genre": defaultdict(set), "tag": defaultdict(set), "keyword": defaultdict(set), "age_rating": defaultdict(set)}
+    for m in load_movies():
+        for g in m["_genres_lc"]:
+            index["genre"][g].add(m["_id"])
+        for t in m["_tags_lc"]:
+            index["tag"][t].add(m["_id"])
+        for k in m["_desc_keywords"]:
+            index["keyword"][k].add(m["_id"])
+        index["age_rating"][m.get("age_rating", "")].add(m["_id"])
+    return index
+
+# --- Filtering/Scoring Utilities ---
+def filter_movies_with_fallback(movies, ids, filters):
+    # An unknown requested rating admits nothing strictly, like an unrated movie
+    max_ord = RATING_ORDER.get(filters.get("min_age_rating", "R"), -1)
+    # Fall back to PG-13 only when no movie in the whole catalog meets the
+    # requested rating; stops at the first one that does
+    if not any(m["_rating_ord"] <= max_ord for m in movies):
+        max_ord = RATING_ORDER["PG-13"]
+    # Only the given ids are walked, in catalog order so ties rank as before
+    return (movies[i] for i in sorted(ids) if movies[i]["_rating_ord"] <= max_ord)
+
+def prep_filters(filters):
+    # Lowercase the filter terms once per search instead of once per movie
+    return {
+        "genres": {g.lower() for g in filters.get("genres", [])},
+        "mood": {m.lower() for m in filters.get("mood", [])},
+        "keywords": {k.lower() for k in filters.get("keywords", [])},
+        "min_age_rating": filters.get("min_age_rating", "")
+    }
+
+def candidate_ids(index, prepped):
+    # Only movies sharing at least one term with the filters can score above 0
+    ids = set()
+    for g in prepped["genres"]:
+        ids |= index["genre"].get(g, set())
+    for t in prepped["mood"]:
+        ids |= index["tag"].get(t, set())
+    if prepped["min_age_rating"]:
+        ids |= index["age_rating"].get(prepped["min_age_rating"], set())
+    for k in prepped["keywords"]:
+        ids |= index["keyword"].get(k, set())
+    return ids
+
+# Strong genres: when requested a movie must have them, and a match counts double
+STRONG_GENRES = frozenset({"horror", "romance"})
+
+def make_scorer(prepped):
+    # Resolve everything that depends only on the filters once, so the
+    # returned function does just the per-movie work
+    genres = prepped["genres"]
+    moods = prepped["mood"]
+    keywords = prepped["keywords"]
+    rating = prepped["min_age_rating"]
+    required = genres & STRONG_GENRES
+    romcom = "romance" in genres and "comedy" in genres
+
+    def score_movie(movie):
+        movie_genres = movie["_genres_lc"]
+        if required and not required <= movie_genres:
+            return 0
+
+        # An exact age-rating match scores on its own; the rest needs some overlap
+        score = 1 if rating and movie.get("age_rating") == rating else 0
+        genre_hits = genres & movie_genres
+        mood_hits = moods & movie["_tags_lc"]
+        keyword_hits = keywords & movie["_desc_keywords"]
+        if not (genre_hits or mood_hits or keyword_hits):
+            return score
+
+        if romcom:
+            if "romance" in movie_genres and "comedy" in movie_genres:
+                score += 3
+            elif "romance" in movie_genres or "comedy" in movie_genres:
+                score += 1
+
+        score += len(genre_hits) + len(genre_hits & STRONG_GENRES)
+        score += len(mood_hits) + len(keyword_hits)
+        return score
+
+    return score_movie
+
+# The ranked pool is a pure function of the filters, so reruns that only
+# reshuffle (or touch other widgets) reuse it; returns the top movie ids
+@st.cache_data(max_entries=256, show_spinner=False)
+def recommend(filters, pool_size=25):
+    prepped = prep_filters(filters)
+    candidates = candidate_ids(build_index(), prepped)
+    score_movie = make_scorer(prepped)
+    # Filter, score and select in a single streamed pass, no intermediate lists
+    scored = ((score_movie(m), m["_id"])
+              for m in filter_movies_with_fallback(load_movies(), candidates, filters))
+    positive = (pair for pair in scored if pair[0] > 0)
+    return [i for _, i in heapq.nlargest(pool_size, positive, key=lambda x: x[0])]
+
+def describe_movie(number, movie):
+    age_warning = ""
+    if movie.get("age_rating") == "Not Rated":
+        age_warning = "\n\n🚨 *This film is not officially rated. Viewer discretion advised.*"
+    return f"""
+Movie {number}: **{movie['title']}**
+- Rating: {movie.get('rating')}
+- Age Rating: {movie.get('age_rating')}
+- Runtime: {movie.get('runtime')} minutes
+- Genres: {', '.join(movie.get('genres', []))}
+- Tags: {', '.join(movie.get('tags', []))}
+- Description: {movie.get('description')}
+- Critics Quote: "{movie.get('rt_quote', '')}"{age_warning}
+"""
+
+# The instructions never change, so they go first (in the system message) and
+# the per-request details last; identical prefixes let OpenAI's prompt cache
+# reuse them across calls
+EXPLAIN_SYSTEM_PROMPT = """
+You are a thoughtful, honest movie assistant. A user asked for a movie recommendation, your system parsed
+their request into filters, and you selected some movies for them. You will be given the request, the
+filters and the details of each selected movie.
+
+Your task, for each movie:
+- Write a short, conversational explanation (~3–5 sentences) of **why this movie fits their request**
+- Start with: "We chose this film because you asked for: '..."
+- If the match is not perfect, say so honestly
+- Emphasize age-appropriateness if it's a good fit
+- End with something warm like "We think you'll enjoy it!"
+
+Respond with a JSON object {"explanations": [...]} holding one explanation string per movie, in the order given.
+"""
+
+# One request explains every card, so the instructions and filters are sent
+# once instead of per movie. Cached per (movies, prompt, filters) for an hour;
+# the movies and client are passed underscored so Streamlit doesn't hash them
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_explanations(movie_ids, user_input, filters, _movies, _client):
+    # Compact JSON: indentation only adds input tokens
+    parsed = orjson.dumps(filters).decode()
+    details = "".join(describe_movie(n, m) for n, m in enumerate(_movies, start=1))
+    prompt = f"""
+The user asked for: "{user_input}"
+Your system parsed the following filters:
+{parsed}
+
+You selected these {len(_movies)} movies. Here are the movie details:
+{details}"""
+    response = _client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        temperature=0.7,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": EXPLAIN_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    )
+    explanations = orjson.loads(response.choices[0].message.content)["explanations"]
+    if not isinstance(explanations, list) or not all(isinstance(e, str) for e in explanations):
+        raise ValueError("Expected a list of explanation strings.")
+    if len(explanations) != len(movie_ids):
+        raise ValueError(f"Expected {len(movie_ids)} explanations, got {len(explanations)}.")
+    return explanations
+
+def explain_movies(movies, user_input, filters, client):
+    # Errors are raised out of the cached call so they are never cached. Only
+    # API failures and malformed replies (orjson errors are ValueErrors) fall
+    # back to the message; anything else is a bug and should surface
+    try:
+        explanations = fetch_explanations(tuple(m["_id"] for m in movies), user_input, filters, movies, client)
+        return [f"### 🎯 Why this movie?\n\n{e}" for e in explanations]
+    except (openai.OpenAIError, ValueError, KeyError, TypeError) as e:
+        return [f"(There was an error generating a response.)\n\n{str(e)}"] * len(movies)
+
+# --- Parse Filters ---
+def parse_filters(user_input):
+    filters = {
+        "genres": [],
+        "mood": [],
+        "min_age_rating": "R",
+        "keywords": []
+    }
+    text = user_input.lower()
+
+    genres = ["action", "comedy", "drama", "romance", "horror", "thriller", "sci-fi", "fantasy", "family"]
+    filters["genres"] = [g for g in genres if g in text]
+
+    if "fun" in text or "light" in text:
+        filters["mood"].append("fun")
+    if "romantic" in text:
+        filters["mood"].append("romantic")
+    if "scary" in text or "tense" in text:
+        filters["mood"].append("intense")
+    if not filters["mood"]:
+        filters["mood"] = ["thoughtful"]
+
+    for word in KEYWORDS:
+        if word in text:
+            filters["keywords"].append(word)
+    return filters